@@ -644,29 +644,34 @@ FIXES:
 - Flow node tracking integrated with Flow Manager lifecycle
 """
 
+import asyncio
 import os
 import sys
 import time
+from functools import partial
 
 from dotenv import load_dotenv
 from loguru import logger
 
 from deepgram import LiveOptions
+from google import genai
 
-from pipecat.audio.vad.silero import SileroVADAnalyzer
 from pipecat.frames.frames import (
     EndFrame, TextFrame, TranscriptionFrame, Frame,
     LLMFullResponseStartFrame, LLMFullResponseEndFrame,
+    LLMTextFrame, AggregatedTextFrame, InterruptionFrame, InputAudioRawFrame,
 )
 from pipecat.processors.frame_processor import FrameProcessor, FrameDirection
 from pipecat.pipeline.pipeline import Pipeline
 from pipecat.pipeline.runner import PipelineRunner
 from pipecat.pipeline.task import PipelineParams, PipelineTask
-from pipecat.processors.aggregators.openai_llm_context import OpenAILLMContext
+from pipecat.processors.aggregators.llm_context import LLMContext
+from pipecat.processors.aggregators.llm_response_universal import LLMContextAggregatorPair
 from pipecat.services.deepgram.stt import DeepgramSTTService
 from pipecat.services.google.llm import GoogleLLMService
 from pipecat.services.deepgram.tts import DeepgramTTSService
 from edge_tts_service import EdgeTTSService
+from tts_chunking import next_split, split_for_tts
 from pipecat.transports.base_transport import TransportParams
 from pipecat.transports.smallwebrtc.connection import SmallWebRTCConnection
 from pipecat.transports.smallwebrtc.transport import SmallWebRTCTransport
@@ -675,8 +680,16 @@ from pipecat_flows import FlowArgs, FlowManager, FlowsFunctionSchema, NodeConfig
 
 load_dotenv(override=True)
 
+# Formatting + the stderr write happen on loguru's background queue thread,
+# not the event loop that is pumping audio frames.
 logger.remove(0)
-logger.add(sys.stderr, level="DEBUG")
+logger.add(
+    sys.stderr,
+    level=os.getenv("LOG_LEVEL", "INFO"),
+    enqueue=True,
+    backtrace=False,
+    diagnose=False,
+)
 
 # ---------------------------------------------------------------------------
 # Priya persona — consistent across all flow nodes
@@ -708,414 +721,435 @@ BORROWER_INFO = (
     "Last Payment: Nov 28, 2024"
 )
 
+# Static prompt prefix (persona + borrower record), assembled once at import.
+# Sent once as the greeting node's role message. With the universal LLMContext
+# the first system message becomes Gemini's system_instruction and later node
+# task messages are appended as turns, so this block stays a byte-identical
+# prompt prefix on every call and Gemini 2.5's implicit context cache can hit.
+# Node task messages carry only their own directive on top of it.
+SYSTEM_MESSAGE = {
+    "role": "system",
+    "content": f"{ROLE_MESSAGE['content']}\n\nBORROWER DETAILS:\n{BORROWER_INFO}",
+}
+
+# Fixed lines the agent is steered to say verbatim — their audio is pre-warmed
+# into the TTS cache so repeat calls skip synthesis for them.
+GREETING_LINE = (
+    "Namaste, kya main Rajesh Kumar ji se baat kar rahi hoon? "
+    "Main Priya bol rahi hoon, QuickFinance ki taraf se."
+)
+CLOSING_LINE = (
+    "Bahut bahut dhanyavaad Rajesh ji! Main aapka Promise to Pay note kar rahi hoon. "
+    "Agar koi bhi help chahiye toh QuickFinance ka helpline number hai aapke paas. "
+    "Aapka din shubh ho!"
+)
+WRONG_PERSON_LINE = (
+    "Oh, maafi chahti hoon aapko disturb karne ke liye. "
+    "Galti se call lag gayi. Aapka din accha ho!"
+)
+CALLBACK_LINE = (
+    "Bilkul Rajesh ji, main aapki request note kar rahi hoon. "
+    "Humare senior representative aapko 24 ghante mein call karenge. "
+    "Dhanyavaad aapke time ke liye!"
+)
+
+EDGE_TTS_VOICE = "hi-IN-SwaraNeural"
+
+# Split exactly as SentenceChunker hands text to TTS, so the cache keys match
+CANNED_PHRASES = tuple(
+    part
+    for line in (GREETING_LINE, CLOSING_LINE, WRONG_PERSON_LINE, CALLBACK_LINE)
+    for part in split_for_tts(line)
+)
+
 # ---------------------------------------------------------------------------
 # Flow state + session tracking — exposed to server.py for dashboard API
 # ---------------------------------------------------------------------------
 FLOW_NODES = [
-    {"id": "greeting", "label": "Greeting"},
-    {"id": "overdue_info", "label": "Overdue Info"},
-    {"id": "understand_situation", "label": "Situation"},
-    {"id": "payment_options", "label": "Options"},
-    {"id": "commitment", "label": "Commitment"},
-    {"id": "promise_to_pay", "label": "PTP"},
-    {"id": "end", "label": "Complete"},
+    {"id": "greeting", "label": "Greeting", "type": "start"},
+    {"id": "overdue_info", "label": "Overdue Info", "type": "process"},
+    {"id": "understand_situation", "label": "Situation", "type": "process"},
+    {"id": "payment_options", "label": "Options", "type": "process"},
+    {"id": "commitment", "label": "Commitment", "type": "process"},
+    {"id": "promise_to_pay", "label": "PTP", "type": "process"},
+    {"id": "end", "label": "Complete", "type": "end"},
 ]
 
 # pc_id -> {current_node, metrics, start_time, tts_type, transcript, _context}
 session_data: dict = {}
 
+# pc_id -> time.monotonic() of the last audio received from the caller.
+# The server registers each connection and reaps ones that go silent.
+last_seen: dict = {}
+
+
+_DASHBOARD_RESYNC = {"resync": True}
+# The server fills in the current metrics on every delta it sends
+_DASHBOARD_METRICS = {"metrics": None}
+
+
+def _push_dashboard(session: dict, delta: dict):
+    """Fan a delta out to every dashboard WebSocket open on the session."""
+    for queue in session.get("_dash_queues", ()):
+        try:
+            queue.put_nowait(delta)
+        except asyncio.QueueFull:
+            # Slow client: drop its backlog and have it send a fresh snapshot
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait(_DASHBOARD_RESYNC)
+
 
 def _track_node(flow_manager: FlowManager, node_name: str):
     """Update the current flow node for the visualization dashboard."""
     pc_id = flow_manager.state.get("pc_id", "")
     if pc_id and pc_id in session_data:
-        session_data[pc_id]["current_node"] = node_name
-        logger.info(f"Flow tracker: {node_name}")
+        session = session_data[pc_id]
+        session["current_node"] = node_name
+        _push_dashboard(session, {"current_node": node_name})
+        logger.debug("Flow tracker: {}", node_name)
+
+
+def _push_metrics(pc_id: str):
+    """Tell the dashboard the message stats changed."""
+    session = session_data.get(pc_id)
+    if session is not None:
+        _push_dashboard(session, _DASHBOARD_METRICS)
 
 
 def _add_transcript(pc_id: str, role: str, text: str):
     """Add a transcript entry to the session data."""
     if pc_id in session_data and text.strip():
-        session_data[pc_id].setdefault("transcript", []).append({
-            "role": role,
-            "text": text.strip()
-        })
-        logger.debug(f"Transcript [{role}]: {text[:50]}...")
+        session = session_data[pc_id]
+        entry = {"role": role, "text": text.strip()}
+        session.setdefault("transcript", []).append(entry)
+        _push_dashboard(session, {"transcript_add": entry})
+        logger.debug("Transcript [{}]: {}...", role, text[:50])
+
+
+# ---------------------------------------------------------------------------
+# Flow transitions
+# ---------------------------------------------------------------------------
+
+async def _transition(args: FlowArgs, flow_manager: FlowManager, *, function: str) -> tuple:
+    """Shared handler for every flow function — driven by TRANSITIONS."""
+    track, updates, result, next_node, log_summary = TRANSITIONS[function]
+    for key, value in updates.items():
+        # None means "take it from the function call arguments"
+        flow_manager.state[key] = args.get(key, "not specified") if value is None else value
+    summary = result.format_map({"plan": "", "payment_date": "", **flow_manager.state})
+    if log_summary:
+        logger.info("Flow: {}", summary)
+    _track_node(flow_manager, track)
+    return summary, next_node
 
 
 # ---------------------------------------------------------------------------
 # Flow Node Definitions
 # ---------------------------------------------------------------------------
+# Built once at import and shared by every call — FlowManager only reads node
+# configs, and per-call progress lives in flow_manager.state.
+
+# Node 1: Greet and confirm identity.
+GREETING_NODE = NodeConfig(
+    name="greeting",
+    role_messages=[SYSTEM_MESSAGE],
+    task_messages=[
+        {
+            "role": "system",
+            "content": (
+                f'Greet in Hinglish: "{GREETING_LINE}" '
+                "Then use confirm_identity if they confirm (even partially), "
+                "or wrong_person if they deny."
+            ),
+        }
+    ],
+    functions=[
+        FlowsFunctionSchema(
+            name="confirm_identity",
+            handler=partial(_transition, function="confirm_identity"),
+            description="Person confirms they are Rajesh Kumar or acknowledges their identity",
+            properties={},
+            required=[],
+        ),
+        FlowsFunctionSchema(
+            name="wrong_person",
+            handler=partial(_transition, function="wrong_person"),
+            description="Person says they are NOT Rajesh Kumar or denies their identity",
+            properties={},
+            required=[],
+        ),
+    ],
+)
 
-def create_greeting_node() -> NodeConfig:
-    """Node 1: Greet and confirm identity."""
-
-    async def confirm_identity(
-        args: FlowArgs, flow_manager: FlowManager
-    ) -> tuple:
-        flow_manager.state["identity_confirmed"] = True
-        _track_node(flow_manager, "overdue_info")
-        return "Identity confirmed as Rajesh Kumar", create_overdue_info_node()
-
-    async def wrong_person(
-        args: FlowArgs, flow_manager: FlowManager
-    ) -> tuple:
-        _track_node(flow_manager, "end")
-        return "Wrong person on the line", create_wrong_person_end_node()
-
-    return NodeConfig(
-        name="greeting",
-        role_messages=[ROLE_MESSAGE],
-        task_messages=[
-            {
-                "role": "system",
-                "content": (
-                    "Greet warmly in Hinglish. Say something like: "
-                    '"Namaste, kya main Rajesh Kumar ji se baat kar rahi hoon? '
-                    'Main Priya bol rahi hoon, QuickFinance ki taraf se."\n\n'
-                    "Wait for their response. Use confirm_identity if they confirm "
-                    "(even partially), or wrong_person if they deny.\n\n"
-                    f"{BORROWER_INFO}"
-                ),
-            }
-        ],
-        functions=[
-            FlowsFunctionSchema(
-                name="confirm_identity",
-                handler=confirm_identity,
-                description="Person confirms they are Rajesh Kumar or acknowledges their identity",
-                properties={},
-                required=[],
+
+# Node 2: Inform about overdue EMIs.
+OVERDUE_INFO_NODE = NodeConfig(
+    name="overdue_info",
+    task_messages=[
+        {
+            "role": "system",
+            "content": (
+                "Gently tell them about the overdue EMIs, e.g. "
+                '"Rajesh ji, aapke do EMIs pending hain, December aur January ke. '
+                'Total Rs. 17,000 outstanding hai." '
+                "Once they respond in any way, use borrower_responds."
             ),
-            FlowsFunctionSchema(
-                name="wrong_person",
-                handler=wrong_person,
-                description="Person says they are NOT Rajesh Kumar or denies their identity",
-                properties={},
-                required=[],
+        }
+    ],
+    functions=[
+        FlowsFunctionSchema(
+            name="borrower_responds",
+            handler=partial(_transition, function="borrower_responds"),
+            description=(
+                "Borrower responds to the overdue information — acknowledges, "
+                "questions, or expresses concern"
             ),
-        ],
-    )
+            properties={},
+            required=[],
+        ),
+    ],
+)
 
 
-def create_overdue_info_node() -> NodeConfig:
-    """Node 2: Inform about overdue EMIs."""
-
-    async def borrower_responds(
-        args: FlowArgs, flow_manager: FlowManager
-    ) -> tuple:
-        _track_node(flow_manager, "understand_situation")
-        return "Borrower acknowledged overdue information", create_situation_node()
-
-    return NodeConfig(
-        name="overdue_info",
-        task_messages=[
-            {
-                "role": "system",
-                "content": (
-                    "Politely inform about overdue EMIs. Say something like: "
-                    '"Rajesh ji, main aapko ek zaroori baat batana chahti thi. '
-                    "Aapke do EMIs pending hain, December aur January ke. "
-                    'Total Rs. 17,000 outstanding hai."\n\n'
-                    "Be gentle and empathetic. After they respond in any way, "
-                    "use borrower_responds to move forward.\n\n"
-                    f"{BORROWER_INFO}"
-                ),
-            }
-        ],
-        functions=[
-            FlowsFunctionSchema(
-                name="borrower_responds",
-                handler=borrower_responds,
-                description=(
-                    "Borrower responds to the overdue information — acknowledges, "
-                    "questions, or expresses concern"
-                ),
-                properties={},
-                required=[],
+# Node 3: Understand borrower's situation.
+SITUATION_NODE = NodeConfig(
+    name="understand_situation",
+    task_messages=[
+        {
+            "role": "system",
+            "content": (
+                "Ask why the EMIs were missed, e.g. "
+                '"Main samajh sakti hoon Rajesh ji. Koi specific wajah thi?" '
+                "Acknowledge their difficulty, then use record_situation."
             ),
-        ],
-    )
+        }
+    ],
+    functions=[
+        FlowsFunctionSchema(
+            name="record_situation",
+            handler=partial(_transition, function="record_situation"),
+            description="Record the borrower's reason for delayed payment",
+            properties={
+                "reason": {
+                    "type": "string",
+                    "description": "Brief summary of why the borrower missed payments",
+                }
+            },
+            required=["reason"],
+        ),
+    ],
+)
 
 
-def create_situation_node() -> NodeConfig:
-    """Node 3: Understand borrower's situation."""
-
-    async def record_situation(
-        args: FlowArgs, flow_manager: FlowManager
-    ) -> tuple:
-        reason = args.get("reason", "not specified")
-        flow_manager.state["reason"] = reason
-        _track_node(flow_manager, "payment_options")
-        return f"Borrower's reason for delay: {reason}", create_payment_options_node()
-
-    return NodeConfig(
-        name="understand_situation",
-        task_messages=[
-            {
-                "role": "system",
-                "content": (
-                    "Ask empathetically about their situation. Say something like: "
-                    '"Main samajh sakti hoon Rajesh ji. Kya aap bata sakte hain ki '
-                    "koi specific wajah thi EMI miss hone ki? "
-                    'Main aapki help karna chahti hoon."\n\n'
-                    "Listen with empathy, acknowledge their difficulties, then use "
-                    "record_situation to capture their reason and move to payment options."
-                ),
-            }
-        ],
-        functions=[
-            FlowsFunctionSchema(
-                name="record_situation",
-                handler=record_situation,
-                description="Record the borrower's reason for delayed payment",
-                properties={
-                    "reason": {
-                        "type": "string",
-                        "description": "Brief summary of why the borrower missed payments",
-                    }
-                },
-                required=["reason"],
+# Node 4: Present payment options.
+PAYMENT_OPTIONS_NODE = NodeConfig(
+    name="payment_options",
+    task_messages=[
+        {
+            "role": "system",
+            "content": (
+                "Offer these options conversationally (not as a list), "
+                "recommending one that suits their situation:\n"
+                "- Full Rs. 17,000 now\n"
+                "- Rs. 8,500 now, Rs. 8,500 within 15 days\n"
+                "- Rs. 5,000 now, rest in 2 installments\n"
+                "- Senior representative callback for restructuring\n"
+                "Use the matching function when they choose."
             ),
-        ],
-    )
+        }
+    ],
+    functions=[
+        FlowsFunctionSchema(
+            name="select_full_payment",
+            handler=partial(_transition, function="select_full_payment"),
+            description="Borrower agrees to pay full Rs. 17,000 immediately",
+            properties={},
+            required=[],
+        ),
+        FlowsFunctionSchema(
+            name="select_split_payment",
+            handler=partial(_transition, function="select_split_payment"),
+            description="Borrower wants to pay Rs. 8,500 now and Rs. 8,500 in 15 days",
+            properties={},
+            required=[],
+        ),
+        FlowsFunctionSchema(
+            name="select_partial_plan",
+            handler=partial(_transition, function="select_partial_plan"),
+            description="Borrower wants to pay Rs. 5,000 now and rest in 2 installments",
+            properties={},
+            required=[],
+        ),
+        FlowsFunctionSchema(
+            name="request_callback",
+            handler=partial(_transition, function="request_callback"),
+            description="Borrower requests a callback from a senior representative for loan restructuring",
+            properties={},
+            required=[],
+        ),
+    ],
+)
 
 
-def create_payment_options_node() -> NodeConfig:
-    """Node 4: Present payment options."""
-
-    async def select_full_payment(
-        args: FlowArgs, flow_manager: FlowManager
-    ) -> tuple:
-        flow_manager.state["plan"] = "Full payment of Rs. 17,000"
-        _track_node(flow_manager, "commitment")
-        return "Full payment of Rs. 17,000 selected", create_commitment_node()
-
-    async def select_split_payment(
-        args: FlowArgs, flow_manager: FlowManager
-    ) -> tuple:
-        flow_manager.state["plan"] = "Rs. 8,500 now + Rs. 8,500 in 15 days"
-        _track_node(flow_manager, "commitment")
-        return "Split payment plan selected", create_commitment_node()
-
-    async def select_partial_plan(
-        args: FlowArgs, flow_manager: FlowManager
-    ) -> tuple:
-        flow_manager.state["plan"] = "Rs. 5,000 now + remaining in 2 installments"
-        _track_node(flow_manager, "commitment")
-        return "Partial payment plan selected", create_commitment_node()
-
-    async def request_callback(
-        args: FlowArgs, flow_manager: FlowManager
-    ) -> tuple:
-        flow_manager.state["plan"] = "Callback requested"
-        _track_node(flow_manager, "end")
-        return "Senior representative callback requested", create_callback_end_node()
-
-    return NodeConfig(
-        name="payment_options",
-        task_messages=[
-            {
-                "role": "system",
-                "content": (
-                    "Present payment options naturally and sympathetically. "
-                    "Do NOT read them as a numbered list. Weave them into conversation.\n\n"
-                    "Options available:\n"
-                    "- Full Rs. 17,000 payment right away\n"
-                    "- Pay one EMI Rs. 8,500 now, second within 15 days\n"
-                    "- Rs. 5,000 now, remaining in 2 easy installments\n"
-                    "- Request a callback from senior representative for restructuring\n\n"
-                    "Recommend based on what the borrower has shared about their situation. "
-                    "Use the matching function when they choose."
-                ),
-            }
-        ],
-        functions=[
-            FlowsFunctionSchema(
-                name="select_full_payment",
-                handler=select_full_payment,
-                description="Borrower agrees to pay full Rs. 17,000 immediately",
-                properties={},
-                required=[],
-            ),
-            FlowsFunctionSchema(
-                name="select_split_payment",
-                handler=select_split_payment,
-                description="Borrower wants to pay Rs. 8,500 now and Rs. 8,500 in 15 days",
-                properties={},
-                required=[],
-            ),
-            FlowsFunctionSchema(
-                name="select_partial_plan",
-                handler=select_partial_plan,
-                description="Borrower wants to pay Rs. 5,000 now and rest in 2 installments",
-                properties={},
-                required=[],
-            ),
-            FlowsFunctionSchema(
-                name="request_callback",
-                handler=request_callback,
-                description="Borrower requests a callback from a senior representative for loan restructuring",
-                properties={},
-                required=[],
+# Node 5: Get payment commitment with a specific date.
+COMMITMENT_NODE = NodeConfig(
+    name="commitment",
+    task_messages=[
+        {
+            "role": "system",
+            "content": (
+                "Confirm the chosen plan and ask for a payment date, e.g. "
+                '"Bahut accha Rajesh ji! Aap kis date tak payment kar denge?" '
+                "Once they give a date (even approximate), use confirm_commitment."
             ),
-        ],
-    )
+        }
+    ],
+    functions=[
+        FlowsFunctionSchema(
+            name="confirm_commitment",
+            handler=partial(_transition, function="confirm_commitment"),
+            description="Borrower commits to a specific payment date",
+            properties={
+                "payment_date": {
+                    "type": "string",
+                    "description": "The date the borrower commits to make payment",
+                }
+            },
+            required=["payment_date"],
+        ),
+    ],
+)
 
 
-def create_commitment_node() -> NodeConfig:
-    """Node 5: Get payment commitment with a specific date."""
-
-    async def confirm_commitment(
-        args: FlowArgs, flow_manager: FlowManager
-    ) -> tuple:
-        date = args.get("payment_date", "not specified")
-        flow_manager.state["payment_date"] = date
-        plan = flow_manager.state.get("plan", "")
-        _track_node(flow_manager, "promise_to_pay")
-        return f"Payment commitment: {plan} by {date}", create_promise_to_pay_node()
-
-    return NodeConfig(
-        name="commitment",
-        task_messages=[
-            {
-                "role": "system",
-                "content": (
-                    "Confirm the chosen payment plan and ask for a specific date. "
-                    "Say something like: "
-                    '"Bahut accha Rajesh ji! Kya aap mujhe ek specific date bata sakte hain '
-                    'jab tak aap payment kar denge?"\n\n'
-                    "Once they give a date (even approximate), use confirm_commitment."
-                ),
-            }
-        ],
-        functions=[
-            FlowsFunctionSchema(
-                name="confirm_commitment",
-                handler=confirm_commitment,
-                description="Borrower commits to a specific payment date",
-                properties={
-                    "payment_date": {
-                        "type": "string",
-                        "description": "The date the borrower commits to make payment",
-                    }
-                },
-                required=["payment_date"],
+# Node 6: Formal Promise to Pay (PTP) confirmation.
+PROMISE_TO_PAY_NODE = NodeConfig(
+    name="promise_to_pay",
+    task_messages=[
+        {
+            "role": "system",
+            "content": (
+                "Restate the plan and date as their Promise to Pay and ask them to "
+                'confirm, e.g. "Rajesh ji, aap [plan] [date] tak kar denge. '
+                'Kya aap yeh Promise to Pay confirm karte hain?" '
+                "Use confirm_ptp if they confirm, revise_plan if they want to change."
             ),
-        ],
-    )
+        }
+    ],
+    functions=[
+        FlowsFunctionSchema(
+            name="confirm_ptp",
+            handler=partial(_transition, function="confirm_ptp"),
+            description="Borrower formally confirms their Promise to Pay commitment",
+            properties={},
+            required=[],
+        ),
+        FlowsFunctionSchema(
+            name="revise_plan",
+            handler=partial(_transition, function="revise_plan"),
+            description="Borrower wants to go back and choose a different payment plan",
+            properties={},
+            required=[],
+        ),
+    ],
+)
 
 
-def create_promise_to_pay_node() -> NodeConfig:
-    """Node 6: Formal Promise to Pay (PTP) confirmation."""
-
-    async def confirm_ptp(
-        args: FlowArgs, flow_manager: FlowManager
-    ) -> tuple:
-        plan = flow_manager.state.get("plan", "")
-        date = flow_manager.state.get("payment_date", "")
-        logger.info(f"Flow: PTP confirmed — {plan} by {date}")
-        _track_node(flow_manager, "end")
-        return f"PTP confirmed: {plan} by {date}", create_end_node()
-
-    async def revise_plan(
-        args: FlowArgs, flow_manager: FlowManager
-    ) -> tuple:
-        _track_node(flow_manager, "payment_options")
-        return "Borrower wants to revise the plan", create_payment_options_node()
-
-    return NodeConfig(
-        name="promise_to_pay",
-        task_messages=[
-            {
-                "role": "system",
-                "content": (
-                    "Formally confirm the Promise to Pay. Summarize the commitment clearly. "
-                    "Say something like: "
-                    '"Rajesh ji, toh main confirm kar rahi hoon — aap [plan details] '
-                    "[date] tak kar denge. Kya aap is commitment ko confirm karte hain? "
-                    'Yeh aapka Promise to Pay hoga."\n\n'
-                    "If they confirm, use confirm_ptp. "
-                    "If they want to change, use revise_plan."
-                ),
-            }
-        ],
-        functions=[
-            FlowsFunctionSchema(
-                name="confirm_ptp",
-                handler=confirm_ptp,
-                description="Borrower formally confirms their Promise to Pay commitment",
-                properties={},
-                required=[],
-            ),
-            FlowsFunctionSchema(
-                name="revise_plan",
-                handler=revise_plan,
-                description="Borrower wants to go back and choose a different payment plan",
-                properties={},
-                required=[],
+# Final node: Thank the borrower and close.
+END_NODE = NodeConfig(
+    name="end",
+    task_messages=[
+        {
+            "role": "system",
+            "content": (
+                "Thank the borrower warmly and close the call. Summarize their "
+                "commitment (plan and payment date) in one sentence, then say: "
+                f'"{CLOSING_LINE}"'
             ),
-        ],
-    )
+        }
+    ],
+    post_actions=[{"type": "end_conversation"}],
+)
 
 
-def create_end_node() -> NodeConfig:
-    """Final node: Thank the borrower and close."""
-    return NodeConfig(
-        name="end",
-        task_messages=[
-            {
-                "role": "system",
-                "content": (
-                    "Thank the borrower warmly and close the call. Summarize their commitment. "
-                    "Say something like: "
-                    '"Bahut bahut dhanyavaad Rajesh ji! Main aapka Promise to Pay note kar rahi hoon. '
-                    "Agar koi bhi help chahiye toh QuickFinance ka helpline number hai aapke paas. "
-                    'Aapka din shubh ho!"\n\n'
-                    "Be warm, professional, and end on a positive note."
-                ),
-            }
-        ],
-        post_actions=[{"type": "end_conversation"}],
-    )
+# End node when the person is not the borrower.
+WRONG_PERSON_END_NODE = NodeConfig(
+    name="wrong_person_end",
+    task_messages=[
+        {
+            "role": "system",
+            "content": (
+                f'Apologize politely and close: "{WRONG_PERSON_LINE}"'
+            ),
+        }
+    ],
+    post_actions=[{"type": "end_conversation"}],
+)
 
 
-def create_wrong_person_end_node() -> NodeConfig:
-    """End node when the person is not the borrower."""
-    return NodeConfig(
-        name="wrong_person_end",
-        task_messages=[
-            {
-                "role": "system",
-                "content": (
-                    "Apologize politely for the inconvenience. Say: "
-                    '"Oh, maafi chahti hoon aapko disturb karne ke liye. '
-                    'Galti se call lag gayi. Aapka din accha ho!"'
-                ),
-            }
-        ],
-        post_actions=[{"type": "end_conversation"}],
-    )
+# End node when borrower requests a senior callback.
+CALLBACK_END_NODE = NodeConfig(
+    name="callback_end",
+    task_messages=[
+        {
+            "role": "system",
+            "content": (
+                f'Confirm the callback request and close: "{CALLBACK_LINE}"'
+            ),
+        }
+    ],
+    post_actions=[{"type": "end_conversation"}],
+)
 
 
-def create_callback_end_node() -> NodeConfig:
-    """End node when borrower requests a senior callback."""
-    return NodeConfig(
-        name="callback_end",
-        task_messages=[
-            {
-                "role": "system",
-                "content": (
-                    "Confirm the callback request warmly. Say something like: "
-                    '"Bilkul Rajesh ji, main aapki request note kar rahi hoon. '
-                    "Humare senior representative aapko 24 ghante mein call karenge. "
-                    'Dhanyavaad aapke time ke liye!"\n\n'
-                    "End the conversation politely."
-                ),
-            }
-        ],
-        post_actions=[{"type": "end_conversation"}],
-    )
+# function name -> (dashboard node, state updates, result summary, next node,
+# log summary). A None state value is read from the function call's arguments;
+# the summary is formatted against flow_manager.state after the updates are
+# applied, and logged at INFO when the last field is True.
+TRANSITIONS = {
+    "confirm_identity": (
+        "overdue_info", {"identity_confirmed": True},
+        "Identity confirmed as Rajesh Kumar", OVERDUE_INFO_NODE, False,
+    ),
+    "wrong_person": (
+        "end", {}, "Wrong person on the line", WRONG_PERSON_END_NODE, False,
+    ),
+    "borrower_responds": (
+        "understand_situation", {},
+        "Borrower acknowledged overdue information", SITUATION_NODE, False,
+    ),
+    "record_situation": (
+        "payment_options", {"reason": None},
+        "Borrower's reason for delay: {reason}", PAYMENT_OPTIONS_NODE, False,
+    ),
+    "select_full_payment": (
+        "commitment", {"plan": "Full payment of Rs. 17,000"},
+        "Full payment of Rs. 17,000 selected", COMMITMENT_NODE, False,
+    ),
+    "select_split_payment": (
+        "commitment", {"plan": "Rs. 8,500 now + Rs. 8,500 in 15 days"},
+        "Split payment plan selected", COMMITMENT_NODE, False,
+    ),
+    "select_partial_plan": (
+        "commitment", {"plan": "Rs. 5,000 now + remaining in 2 installments"},
+        "Partial payment plan selected", COMMITMENT_NODE, False,
+    ),
+    "request_callback": (
+        "end", {"plan": "Callback requested"},
+        "Senior representative callback requested", CALLBACK_END_NODE, False,
+    ),
+    "confirm_commitment": (
+        "promise_to_pay", {"payment_date": None},
+        "Payment commitment: {plan} by {payment_date}", PROMISE_TO_PAY_NODE, False,
+    ),
+    "confirm_ptp": (
+        "end", {}, "PTP confirmed: {plan} by {payment_date}", END_NODE, True,
+    ),
+    "revise_plan": (
+        "payment_options", {},
+        "Borrower wants to revise the plan", PAYMENT_OPTIONS_NODE, False,
+    ),
+}
 
 
 # ---------------------------------------------------------------------------
@@ -1205,12 +1239,18 @@ class TranscriptMonitor(FrameProcessor):
     async def process_frame(self, frame: Frame, direction: FrameDirection):
         await super().process_frame(frame, direction)
         
+        # Caller audio (passed through by STT) keeps the connection alive;
+        # only refresh entries the server still tracks
+        if isinstance(frame, InputAudioRawFrame):
+            if self._pc_id in last_seen:
+                last_seen[self._pc_id] = time.monotonic()
+
         # Capture user transcription
-        if isinstance(frame, TranscriptionFrame):
+        elif isinstance(frame, TranscriptionFrame):
             text = frame.text.strip()
             if text:
                 _add_transcript(self._pc_id, "user", text)
-                logger.debug(f"📝 User transcript captured: {text[:50]}...")
+                logger.debug("📝 User transcript captured: {}...", text[:50])
         
         # Detect assistant response start
         elif isinstance(frame, LLMFullResponseStartFrame):
@@ -1227,64 +1267,305 @@ class TranscriptMonitor(FrameProcessor):
         elif isinstance(frame, LLMFullResponseEndFrame):
             if self._assistant_buffer.strip():
                 _add_transcript(self._pc_id, "assistant", self._assistant_buffer.strip())
-                logger.debug(f"🤖 Assistant transcript captured: {self._assistant_buffer[:50]}...")
+                logger.debug("🤖 Assistant transcript captured: {}...", self._assistant_buffer[:50])
             self._is_assistant_speaking = False
             self._assistant_buffer = ""
         
         await self.push_frame(frame, direction)
 
+
+# ---------------------------------------------------------------------------
+# Running message stats for the dashboard
+# ---------------------------------------------------------------------------
+def _message_words(message) -> int:
+    """Whitespace-separated words in a universal-format message's text content."""
+    content = message.get("content")
+    if isinstance(content, str):
+        return len(content.split())
+    if isinstance(content, list):
+        return sum(
+            len(part.get("text", "").split())
+            for part in content
+            if isinstance(part, dict)
+        )
+    return 0
+
+
+class StatsLLMContext(LLMContext):
+    """LLMContext that keeps per-role message and word counts as messages arrive.
+
+    The dashboard reads ``stats`` instead of rescanning the whole history on
+    every poll. ``stats`` is updated in place so references to it stay live,
+    and ``on_change`` (if given) is called after every update.
+    """
+
+    def __init__(self, messages=None, *, on_change=None, **kwargs):
+        self.stats = {"total": 0, "user": 0, "assistant": 0, "system": 0, "word_count": 0}
+        self._on_change = None  # Nobody is watching the initial count
+        super().__init__(messages, **kwargs)
+        self._count(self._messages)
+        self._on_change = on_change
+
+    def _count(self, messages):
+        stats = self.stats
+        for message in messages:
+            stats["total"] += 1
+            # LLM-specific messages have no standard role/content to count
+            if type(message) is not dict:
+                continue
+            role = message.get("role")
+            if role in stats:
+                stats[role] += 1
+            stats["word_count"] += _message_words(message)
+        if self._on_change is not None:
+            self._on_change()
+
+    def add_message(self, message):
+        super().add_message(message)
+        self._count((message,))
+
+    def add_messages(self, messages):
+        super().add_messages(messages)
+        self._count(messages)
+
+    def set_messages(self, messages):
+        super().set_messages(messages)
+        for key in self.stats:
+            self.stats[key] = 0
+        self._count(self._messages)
+
+# ---------------------------------------------------------------------------
+# Process-wide LLM/TTS concurrency limits
+# ---------------------------------------------------------------------------
+# Every call gets its own services, but they share the event loop, sockets and
+# CPU. Queuing the second caller behind the first keeps p50 latency at the
+# uncontended level instead of both calls degrading together. Edge TTS decodes
+# on a small thread pool (see edge_tts_service); Deepgram TTS is network-bound.
+LLM_SEM = asyncio.Semaphore(int(os.getenv("LLM_CONCURRENCY", "1")))
+TTS_SEM = asyncio.Semaphore(int(os.getenv("TTS_CONCURRENCY", "2")))
+
+
+# One genai client per API key, reused by every call so Gemini requests ride
+# the client's warm keep-alive connection pool instead of a fresh TLS handshake.
+_GENAI_CLIENTS: dict = {}
+
+
+class GatedGoogleLLMService(GoogleLLMService):
+    """GoogleLLMService that holds an LLM_SEM slot for each generation.
+
+    Also shares the underlying genai client (and its connection pool) across
+    calls; only the per-call pipeline state lives on the service instance.
+    """
+
+    def create_client(self):
+        client = _GENAI_CLIENTS.get(self._api_key)
+        if client is None:
+            client = genai.Client(api_key=self._api_key, http_options=self._http_options)
+            _GENAI_CLIENTS[self._api_key] = client
+        self._client = client
+
+    async def _close_client(self):
+        # Shared with other calls — keep the pooled connections open
+        pass
+
+    async def _process_context(self, context):
+        async with LLM_SEM:
+            await super()._process_context(context)
+
+
+class _TTSGate:
+    """Mixin that holds a TTS_SEM slot while a TTS service synthesizes."""
+
+    async def run_tts(self, text: str):
+        async with TTS_SEM:
+            async for frame in super().run_tts(text):
+                yield frame
+
+
+class GatedDeepgramTTSService(_TTSGate, DeepgramTTSService):
+    pass
+
+
+class GatedEdgeTTSService(_TTSGate, EdgeTTSService):
+    pass
+
+# ---------------------------------------------------------------------------
+# Clause-level chunking between LLM and TTS
+# ---------------------------------------------------------------------------
+
+class SentenceChunker(FrameProcessor):
+    """Flush streamed LLM text to TTS at sentence/clause boundaries.
+
+    The TTS services' built-in aggregator waits for a full sentence. This
+    flushes earlier — on sentence end, on a comma once 4+ words are buffered,
+    or past 80 characters (see tts_chunking) — so synthesis of the first
+    clause starts while Gemini is still decoding the rest of the turn.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._buffer = ""
+        self._skip_tts = None
+
+    async def _push_text(self, text: str):
+        if text.strip():
+            out = AggregatedTextFrame(text=text, aggregated_by="sentence")
+            out.skip_tts = self._skip_tts
+            await self.push_frame(out)
+
+    async def _flush(self):
+        text = self._buffer
+        self._buffer = ""
+        await self._push_text(text)
+
+    async def process_frame(self, frame: Frame, direction: FrameDirection):
+        await super().process_frame(frame, direction)
+
+        if isinstance(frame, InterruptionFrame):
+            # Barge-in: drop queued text so it never reaches TTS; the TTS
+            # service cancels its own in-flight synthesis on this frame.
+            self._buffer = ""
+            await self.push_frame(frame, direction)
+        elif isinstance(frame, LLMTextFrame):
+            self._buffer += frame.text
+            self._skip_tts = frame.skip_tts
+            while (cut := next_split(self._buffer)) is not None:
+                text, self._buffer = self._buffer[:cut], self._buffer[cut:]
+                await self._push_text(text)
+        elif isinstance(frame, (LLMFullResponseEndFrame, EndFrame)):
+            await self._flush()
+            await self.push_frame(frame, direction)
+        else:
+            await self.push_frame(frame, direction)
+
+# ---------------------------------------------------------------------------
+# Connect-time warmup
+# ---------------------------------------------------------------------------
+
+async def _prime_llm(llm: GoogleLLMService):
+    """Open the genai client's HTTPS connection before the greeting needs it.
+
+    A metadata lookup (no generation, no token quota) completes DNS + TLS so
+    the greeting's streaming request goes out on a warm connection.
+    """
+    try:
+        await llm._client.aio.models.get(model=llm.model_name)
+    except Exception as e:
+        logger.debug("LLM primer skipped: {}", e)
+
+
+async def warmup():
+    """Server-start warmup, run in the background from server.py's lifespan.
+
+    Synthesizes the canned lines into the shared Edge TTS cache, so the
+    first Edge call starts hot.
+    """
+    try:
+        await EdgeTTSService(voice=EDGE_TTS_VOICE).prewarm(CANNED_PHRASES)
+        logger.info("Warmup: {} canned phrases cached", len(CANNED_PHRASES))
+    except Exception as e:
+        logger.warning("Warmup skipped: {}", e)
+
 # ---------------------------------------------------------------------------
 # Bot Pipeline
 # ---------------------------------------------------------------------------
 
+# Deepgram streaming options — identical for every call, and DeepgramSTTService
+# only reads them (it merges a copy into its own settings), so build them once.
+STT_LIVE_OPTIONS = LiveOptions(
+    language="hi",
+    model="nova-2",
+    # The LLM reads raw words fine; skip Deepgram's formatting passes
+    smart_format=False,
+    punctuate=False,
+    profanity_filter=False,
+    encoding="linear16",
+    sample_rate=16000,
+    channels=1,
+    # Finalize after 300 ms of silence. That is later than Deepgram's 10 ms
+    # default, which finalizes on short mid-sentence pauses and would split
+    # one borrower turn into several LLM turns.
+    interim_results=True,
+    endpointing=300,
+    utterance_end_ms=1000,
+    # Deepgram's speech-start events are the only barge-in signal (there is
+    # no local VAD). NOTE: vad_events is deprecated since pipecat 0.0.99,
+    # logs a warning per call and is scheduled for removal — barge-in needs
+    # a local VAD (e.g. Silero) before that pipecat upgrade.
+    vad_events=True,
+)
+
+
 async def run_bot(webrtc_connection: SmallWebRTCConnection, tts_type: str = "deepgram"):
     """Create and run the voice agent pipeline with Pipecat Flows."""
 
     pc_id = webrtc_connection.pc_id
 
+    # Call-scoped helper tasks. The loop only holds weak references to tasks,
+    # so keep them here until done, and cancel any still running at call end.
+    call_tasks = set()
+
+    def spawn(coro):
+        t = asyncio.create_task(coro)
+        call_tasks.add(t)
+        t.add_done_callback(call_tasks.discard)
+        return t
+
     # --- Transport (WebRTC) ---
+    # 20 ms output chunks (default 40 ms) so audio reaches the peer sooner
     transport = SmallWebRTCTransport(
         webrtc_connection=webrtc_connection,
-        params=TransportParams(audio_in_enabled=True, audio_out_enabled=True),
+        params=TransportParams(
+            audio_in_enabled=True,
+            # Resample to exactly what Deepgram is told it receives below
+            audio_in_sample_rate=16000,
+            audio_in_channels=1,
+            audio_out_enabled=True,
+            audio_out_10ms_chunks=2,
+        ),
     )
 
     # --- Speech-to-Text (Deepgram Nova-2 — excellent Hindi + English) ---
     stt = DeepgramSTTService(
         api_key=os.getenv("DEEPGRAM_API_KEY"),
-        live_options=LiveOptions(
-            language="hi",
-            model="nova-2",
-            smart_format=True,
-            encoding="linear16",
-            sample_rate=16000,
-            channels=1,
-        ),
+        live_options=STT_LIVE_OPTIONS,
     )
 
     # --- LLM (Google Gemini 2.5 Flash) ---
-    llm = GoogleLLMService(
+    llm = GatedGoogleLLMService(
         api_key=os.getenv("GOOGLE_API_KEY"),
         model="gemini-2.5-flash",
     )
 
+    # Warm Gemini's connection while ICE/DTLS negotiate with the browser
+    spawn(_prime_llm(llm))
+
     # --- Text-to-Speech ---
     if tts_type == "edge":
-        logger.info("Using Edge TTS (hi-IN-SwaraNeural)")
-        tts = EdgeTTSService(voice="hi-IN-SwaraNeural")
+        logger.info("Using Edge TTS ({})", EDGE_TTS_VOICE)
+        tts = GatedEdgeTTSService(voice=EDGE_TTS_VOICE)
+        # Fill the shared audio cache with the canned lines (no-op once warm)
+        spawn(tts.prewarm(CANNED_PHRASES))
     else:
         logger.info("Using Deepgram TTS (aura-2-helena-en)")
-        tts = DeepgramTTSService(
+        tts = GatedDeepgramTTSService(
             api_key=os.getenv("DEEPGRAM_API_KEY"),
             voice="aura-2-helena-en",
         )
 
     # --- Conversation context (empty — FlowManager populates it) ---
-    context = OpenAILLMContext([])
-    context_aggregator = llm.create_context_aggregator(context)
+    # Universal context keeps SYSTEM_MESSAGE pinned as the system instruction
+    # (the legacy Google context replaced it with each node's task message,
+    # which changed the prompt prefix on every transition and defeated caching).
+    context = StatsLLMContext(on_change=partial(_push_metrics, pc_id))
+    context_aggregator = LLMContextAggregatorPair(context)
 
     # --- Transcript monitor (single processor for both user and assistant) ---
     transcript_monitor = TranscriptMonitor(pc_id)
 
+    # --- Clause chunker (starts TTS on the first clause, not the full turn) ---
+    sentence_chunker = SentenceChunker()
+
     # --- Pipeline ---
     pipeline = Pipeline(
         [
@@ -1293,6 +1574,7 @@ async def run_bot(webrtc_connection: SmallWebRTCConnection, tts_type: str = "dee
             transcript_monitor,  # Monitor all frames for transcript capture
             context_aggregator.user(),
             llm,
+            sentence_chunker,
             tts,
             transport.output(),
             context_aggregator.assistant(),
@@ -1338,7 +1620,7 @@ async def run_bot(webrtc_connection: SmallWebRTCConnection, tts_type: str = "dee
         "tts_type": tts_type,  
         "transcript": [],  
         "_context": context,  
-        "context_aggregator": context_aggregator,  # ✅ Store reference for metrics  
+        "_stats": context.stats,  # Running counts for the dashboard metrics
     }  
     
     # --- Event handlers ---  
@@ -1346,7 +1628,7 @@ async def run_bot(webrtc_connection: SmallWebRTCConnection, tts_type: str = "dee
     async def on_client_connected(transport, client):  
         logger.info(f"Client connected: {client}")  
         flow_manager.state["pc_id"] = pc_id  
-        await flow_manager.initialize(create_greeting_node())
+        await flow_manager.initialize(GREETING_NODE)
 
     @transport.event_handler("on_client_disconnected")
     async def on_client_disconnected(transport, client):
@@ -1356,4 +1638,8 @@ async def run_bot(webrtc_connection: SmallWebRTCConnection, tts_type: str = "dee
 
     # --- Run ---
     runner = PipelineRunner()
-    await runner.run(task)
\ No newline at end of file
+    try:
+        await runner.run(task)
+    finally:
+        for t in list(call_tasks):
+            t.cancel()
\ No newline at end of file
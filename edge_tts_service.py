@@ -5,13 +5,25 @@ Custom TTSService wrapping Microsoft Edge TTS (free, no API key needed).
 Supports Hindi, English, and many other languages with natural-sounding voices.
 """
 
+import asyncio
+import hashlib
 import io
-from typing import AsyncGenerator
+import os
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncGenerator, Iterable, Optional
 
 import av
 import edge_tts
+import numpy as np
 from loguru import logger
 
+try:
+    # Optional: single-call C decoder for whole utterances (see requirements.txt)
+    import miniaudio
+except ImportError:
+    miniaudio = None
+
 from pipecat.frames.frames import (
     ErrorFrame,
     Frame,
@@ -22,6 +34,256 @@ from pipecat.frames.frames import (
 from pipecat.services.tts_service import TTSService
 
 EDGE_TTS_SAMPLE_RATE = 24000
+TTS_CACHE_MAX_ENTRIES = 128
+TTS_CACHE_MAX_BYTES = int(os.getenv("TTS_CACHE_MAX_MB", "50")) * 1024 * 1024
+TTS_DECODE_WORKERS = int(os.getenv("TTS_DECODE_WORKERS", "2"))
+
+
+def _pcm_view(frame) -> memoryview:
+    """Zero-copy view of a packed s16 mono frame's samples (planes are padded)."""
+    return memoryview(frame.planes[0])[: frame.samples * 2]
+
+
+def decode_mp3_to_pcm(mp3_bytes: bytes) -> bytes:
+    """Decode MP3 bytes to 16-bit mono PCM at 24 kHz."""
+    if miniaudio is not None:
+        decoded = miniaudio.decode(
+            mp3_bytes,
+            output_format=miniaudio.SampleFormat.SIGNED16,
+            nchannels=1,
+            sample_rate=EDGE_TTS_SAMPLE_RATE,
+        )
+        return decoded.samples.tobytes()
+
+    buf = io.BytesIO(mp3_bytes)
+    container = av.open(buf, format="mp3")
+    frames = list(container.decode(audio=0))
+    container.close()
+    if not frames:
+        return b""
+
+    # Edge TTS voices already decode to 24 kHz mono float: only the sample
+    # format changes, so convert the whole utterance in one vectorized pass
+    # (same rounding/clipping as swresample) instead of frame by frame.
+    first = frames[0]
+    if (
+        first.sample_rate == EDGE_TTS_SAMPLE_RATE
+        and first.layout.name == "mono"
+        and first.format.name in ("flt", "fltp")
+    ):
+        samples = np.concatenate([frame.to_ndarray().reshape(-1) for frame in frames])
+        return np.clip(np.rint(samples * 32768), -32768, 32767).astype("<i2").tobytes()
+
+    resampler = av.AudioResampler(
+        format="s16", layout="mono", rate=EDGE_TTS_SAMPLE_RATE
+    )
+    pcm = bytearray()
+    for frame in frames + [None]:
+        for rf in resampler.resample(frame):
+            pcm += _pcm_view(rf)
+    return bytes(pcm)
+
+
+# MP3 decode (whole utterances and streamed fragments) runs off the event loop
+# that carries every call's WebRTC audio. A decode takes a couple of ms, less
+# than shipping the bytes to another process would, and PyAV/miniaudio release
+# the GIL while decoding, so threads are enough.
+_decode_threads = ThreadPoolExecutor(
+    max_workers=TTS_DECODE_WORKERS, thread_name_prefix="edge-tts-decode"
+)
+
+
+# Samples of MP3 decoder delay (528 + 1), as trimmed by ffmpeg's mp3 demuxer
+_MP3_DECODER_DELAY = 529
+
+
+def _slice_frame(frame, start: int, stop: int):
+    """Copy of ``frame`` holding only samples [start, stop)."""
+    samples = frame.to_ndarray()
+    if frame.format.is_planar:
+        samples = samples[:, start:stop]
+    else:
+        channels = len(frame.layout.channels)
+        samples = samples[:, start * channels : stop * channels]
+    sliced = av.AudioFrame.from_ndarray(
+        np.ascontiguousarray(samples), format=frame.format.name, layout=frame.layout.name
+    )
+    sliced.sample_rate = frame.sample_rate
+    return sliced
+
+
+class MP3StreamDecoder:
+    """Incremental MP3 -> 16-bit mono 24 kHz PCM decoder.
+
+    Edge TTS streams MP3 in fragments that don't align with MP3 frames; the
+    codec parser reassembles frames across fragments, so PCM can be produced
+    as each fragment arrives instead of after the whole utterance.
+
+    Output matches decode_mp3_to_pcm: when the stream starts with a Xing/Info
+    frame carrying a LAME gapless tag, the tag frame is dropped and the encoder
+    delay and padding are trimmed, like ffmpeg's mp3 demuxer does.
+    """
+
+    def __init__(self):
+        self._codec = av.CodecContext.create("mp3", "r")
+        self._resampler = av.AudioResampler(
+            format="s16", layout="mono", rate=EDGE_TTS_SAMPLE_RATE
+        )
+        self._header_checked = False
+        # Gapless trim, in source samples (before resampling)
+        self._skip = 0
+        self._end_trim = 0
+        self._held = []  # decoded frames that may still be end padding
+
+    def _first_frame(self, data: bytes) -> Optional[bytes]:
+        """Read gapless info from the first frame.
+
+        Returns the bytes to decode, or None for a packet that carries no
+        audio (a lone ID3 tag, or the Xing/Info tag frame).
+        """
+        if data.startswith(b"ID3") and len(data) >= 10:
+            # ID3v2 size is syncsafe (7 bits per byte), plus the 10-byte header.
+            # The parser may glue the first MP3 frame onto the tag.
+            size = 10 + ((data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9])
+            data = data[size:]
+            if not data:
+                return None
+        self._header_checked = True
+
+        # Side info length puts the tag at 13 (MPEG-2 mono), 21 or 36 bytes
+        tag = next(
+            (off for off in (13, 21, 36) if data[off : off + 4] in (b"Xing", b"Info")),
+            None,
+        )
+        if tag is None:
+            return data
+
+        flags = int.from_bytes(data[tag + 4 : tag + 8], "big")
+        pos = tag + 8 + 4 * (flags & 1) + 4 * (flags >> 1 & 1) + 100 * (flags >> 2 & 1) + 4 * (flags >> 3 & 1)
+        lame = data[pos : pos + 24]
+        if len(lame) == 24 and lame[:4] in (b"LAME", b"Lavf", b"Lavc"):
+            delays = int.from_bytes(lame[21:24], "big")
+            self._skip = (delays >> 12) + _MP3_DECODER_DELAY
+            if flags & 1:
+                # Only trimmed when the frame count is known, as ffmpeg does
+                self._end_trim = max((delays & 0xFFF) - _MP3_DECODER_DELAY, 0)
+        return None
+
+    def _resample(self, frames) -> bytes:
+        pcm = bytearray()
+        for frame in frames:
+            for rf in self._resampler.resample(frame):
+                pcm += _pcm_view(rf)
+        return bytes(pcm)
+
+    def _decode(self, packets) -> list:
+        frames = []
+        for packet in packets:
+            if not self._header_checked:
+                data = self._first_frame(bytes(packet))
+                if data is None:
+                    continue
+                packet = av.Packet(data)
+            try:
+                frames.extend(self._codec.decode(packet))
+            except av.error.InvalidDataError:
+                # Non-audio frame (e.g. a tag) — skip it like ffmpeg does
+                continue
+        return frames
+
+    def _trim(self, frames: list) -> list:
+        """Drop the encoder delay and hold back what may be end padding."""
+        out = []
+        for frame in frames:
+            if self._skip:
+                if frame.samples <= self._skip:
+                    self._skip -= frame.samples
+                    continue
+                frame = _slice_frame(frame, self._skip, frame.samples)
+                self._skip = 0
+            out.append(frame)
+        if not self._end_trim:
+            return out
+
+        self._held.extend(out)
+        held = sum(frame.samples for frame in self._held)
+        release = []
+        while self._held and held - self._held[0].samples >= self._end_trim:
+            frame = self._held.pop(0)
+            held -= frame.samples
+            release.append(frame)
+        return release
+
+    def feed(self, mp3_bytes: bytes) -> bytes:
+        """Decode whatever complete MP3 frames are now available."""
+        return self._resample(self._trim(self._decode(self._codec.parse(mp3_bytes))))
+
+    def flush(self) -> bytes:
+        """Drain the parser, decoder and resampler at end of stream."""
+        frames = self._decode(self._codec.parse(None))
+        frames.extend(self._codec.decode(None))
+        frames = self._trim(frames)
+        # What's still held back ends with the padding; keep only the audio
+        keep = sum(frame.samples for frame in self._held) - self._end_trim
+        for frame in self._held:
+            if keep <= 0:
+                break
+            frames.append(frame if frame.samples <= keep else _slice_frame(frame, 0, keep))
+            keep -= frame.samples
+        self._held = []
+        frames.append(None)
+        return self._resample(frames)
+
+
+class SynthesisCache:
+    """In-memory LRU of synthesized PCM keyed by (voice, normalized text).
+
+    Canned lines (greeting, closings) repeat across calls; a hit replays the
+    stored PCM instead of a round-trip to the TTS backend. Bounded both by
+    entry count and by total PCM bytes held.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = TTS_CACHE_MAX_ENTRIES,
+        max_bytes: int = TTS_CACHE_MAX_BYTES,
+    ):
+        self._max_entries = max_entries
+        self._max_bytes = max_bytes
+        self._size = 0
+        self._entries: "OrderedDict[bytes, bytes]" = OrderedDict()
+
+    @staticmethod
+    def _key(voice: str, text: str) -> bytes:
+        # Whitespace differences from LLM streaming shouldn't miss the cache
+        normalized = " ".join(text.split())
+        return hashlib.blake2b(
+            f"{voice}|{normalized}".encode("utf-8"), digest_size=16
+        ).digest()
+
+    def get(self, voice: str, text: str) -> Optional[bytes]:
+        key = self._key(voice, text)
+        pcm = self._entries.get(key)
+        if pcm is not None:
+            self._entries.move_to_end(key)
+        return pcm
+
+    def put(self, voice: str, text: str, pcm: bytes):
+        if len(pcm) > self._max_bytes:
+            return
+        key = self._key(voice, text)
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._size -= len(old)
+        self._entries[key] = pcm
+        self._size += len(pcm)
+        while len(self._entries) > self._max_entries or self._size > self._max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= len(evicted)
+
+
+# Shared by every EdgeTTSService in the process (one service per call)
+synthesis_cache = SynthesisCache()
 
 
 class EdgeTTSService(TTSService):
@@ -38,42 +300,85 @@ class EdgeTTSService(TTSService):
         super().__init__(sample_rate=EDGE_TTS_SAMPLE_RATE, **kwargs)
         self.set_voice(voice)
 
-    def _decode_mp3_to_pcm(self, mp3_bytes: bytes) -> bytes:
-        """Decode MP3 bytes to 16-bit mono PCM at 24 kHz."""
-        buf = io.BytesIO(mp3_bytes)
-        container = av.open(buf, format="mp3")
-        resampler = av.AudioResampler(
-            format="s16", layout="mono", rate=EDGE_TTS_SAMPLE_RATE
-        )
+    async def _synthesize(self, text: str) -> bytes:
+        """Synthesize text with Edge TTS and return 16-bit mono PCM."""
+        communicate = edge_tts.Communicate(text, voice=self._voice_id)
+
+        # Collect all MP3 chunks then decode in one shot
+        # (edge-tts streams small MP3 fragments that aren't independently decodable)
+        mp3_data = bytearray()
+        async for chunk in communicate.stream():
+            if chunk["type"] == "audio":
+                mp3_data.extend(chunk["data"])
+
+        if not mp3_data:
+            return b""
+        return await self._decode(bytes(mp3_data))
+
+    async def _decode(self, mp3_bytes: bytes) -> bytes:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_decode_threads, decode_mp3_to_pcm, mp3_bytes)
+
+    async def _stream_pcm(self, text: str) -> AsyncGenerator[bytes, None]:
+        """Yield PCM while Edge TTS is still streaming the utterance's MP3."""
+        communicate = edge_tts.Communicate(text, voice=self._voice_id)
+        decoder: Optional[MP3StreamDecoder] = MP3StreamDecoder()
+        mp3_data = bytearray()
+        streamed = False
+        loop = asyncio.get_running_loop()
 
-        pcm_chunks = []
-        for frame in container.decode(audio=0):
-            resampled = resampler.resample(frame)
-            for rf in resampled:
-                pcm_chunks.append(rf.to_ndarray().tobytes())
+        async for chunk in communicate.stream():
+            if chunk["type"] != "audio":
+                continue
+            mp3_data.extend(chunk["data"])
+            if decoder is None:
+                continue
+            try:
+                # One fragment at a time, so the decoder is never shared
+                pcm = await loop.run_in_executor(
+                    _decode_threads, decoder.feed, chunk["data"]
+                )
+            except av.error.FFmpegError:
+                if streamed:
+                    raise
+                # Nothing played yet — decode the whole utterance at the end
+                logger.debug("EdgeTTSService: streaming decode failed, buffering")
+                decoder = None
+                continue
+            if pcm:
+                streamed = True
+                yield pcm
 
-        container.close()
-        return b"".join(pcm_chunks)
+        if decoder is not None:
+            tail = await loop.run_in_executor(_decode_threads, decoder.flush)
+            if tail:
+                yield tail
+        elif mp3_data:
+            yield await self._decode(bytes(mp3_data))
+
+    async def prewarm(self, texts: Iterable[str]):
+        """Synthesize fixed phrases into the shared cache ahead of use."""
+        for text in texts:
+            if synthesis_cache.get(self._voice_id, text) is not None:
+                continue
+            try:
+                pcm_data = await self._synthesize(text)
+                if pcm_data:
+                    synthesis_cache.put(self._voice_id, text, pcm_data)
+            except Exception as e:
+                logger.warning("EdgeTTSService: prewarm failed for [{}]: {}", text, e)
 
     async def run_tts(self, text: str) -> AsyncGenerator[Frame, None]:
-        logger.debug(f"EdgeTTSService: Generating TTS [{text}]")
+        logger.debug("EdgeTTSService: Generating TTS [{}]", text)
 
         try:
             await self.start_ttfb_metrics()
             yield TTSStartedFrame()
 
-            communicate = edge_tts.Communicate(text, voice=self._voice_id)
-
-            # Collect all MP3 chunks then decode in one shot
-            # (edge-tts streams small MP3 fragments that aren't independently decodable)
-            mp3_data = bytearray()
-            async for chunk in communicate.stream():
-                if chunk["type"] == "audio":
-                    mp3_data.extend(chunk["data"])
-
-            if mp3_data:
+            pcm_data = synthesis_cache.get(self._voice_id, text)
+            if pcm_data is not None:
+                logger.debug("EdgeTTSService: cache hit [{}]", text)
                 await self.stop_ttfb_metrics()
-                pcm_data = self._decode_mp3_to_pcm(bytes(mp3_data))
 
                 # Yield in chunks for smooth streaming
                 chunk_size = self.chunk_size
@@ -83,6 +388,20 @@ class EdgeTTSService(TTSService):
                         sample_rate=EDGE_TTS_SAMPLE_RATE,
                         num_channels=1,
                     )
+            else:
+                # TTFB is the first decoded audio, not the end of synthesis
+                pcm = bytearray()
+                async for audio in self._stream_pcm(text):
+                    if not pcm:
+                        await self.stop_ttfb_metrics()
+                    pcm += audio
+                    yield TTSAudioRawFrame(
+                        audio=audio,
+                        sample_rate=EDGE_TTS_SAMPLE_RATE,
+                        num_channels=1,
+                    )
+                if pcm:
+                    synthesis_cache.put(self._voice_id, text, bytes(pcm))
 
             yield TTSStoppedFrame()
 
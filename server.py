@@ -5,33 +5,78 @@ Serves the WebRTC frontend and handles signaling for voice calls.
 Run with: python server.py
 """
 
+import asyncio
 import os
+import sys
 import argparse
+import time
 from contextlib import asynccontextmanager
-from typing import Dict
+from functools import partial
+from typing import Dict, Optional
 
 from dotenv import load_dotenv
-from fastapi import FastAPI, Request, HTTPException
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi import FastAPI, Request, HTTPException, WebSocket, WebSocketDisconnect
+import msgspec
+import orjson
+from fastapi.responses import HTMLResponse, ORJSONResponse, Response
 from fastapi.staticfiles import StaticFiles
-from starlette.background import BackgroundTask
+from aiortc import RTCIceServer
 from loguru import logger
 
 from pipecat.transports.smallwebrtc.connection import SmallWebRTCConnection
 
-from bot import run_bot, session_data, FLOW_NODES
+from bot import EDGE_TTS_VOICE, FLOW_NODES, run_bot, session_data, last_seen, warmup
 
 load_dotenv(override=True)
 
-# Track active peer connections
+_INDEX_PATH = os.path.join("static", "index.html")
+
+# Track active peer connections. Strong references: the server is the only
+# party that can disconnect them; _remove and the idle reaper bound their life.
 pcs_map: Dict[str, SmallWebRTCConnection] = {}
+# Bot pipeline task per connection, so shutdown can cancel it
+bot_tasks: Dict[str, asyncio.Task] = {}
 
+# Time a pipeline gets to finish on its own (EndFrame) before it is cancelled
+BOT_TASK_GRACE_SECONDS = 5
+
+# Connections whose caller has sent no audio for this long are torn down,
+# in case on_closed never fires (page refresh, dropped network)
+IDLE_TIMEOUT_SECONDS = int(os.getenv("IDLE_TIMEOUT_SECONDS", "900"))
+REAPER_INTERVAL_SECONDS = 30
+
+
+def _remove(cid: str) -> Optional[SmallWebRTCConnection]:
+    """Drop every reference to a connection; safe to call more than once.
+
+    Only synchronous pops, so on_closed and /api/disconnect can't interleave.
+    The bot task stays in bot_tasks (its done-callback removes it) and is only
+    cancelled if it hasn't wound down after the grace period.
+    """
+    connection = pcs_map.pop(cid, None)
+    session_data.pop(cid, None)
+    last_seen.pop(cid, None)
+    task = bot_tasks.get(cid)
+    if task is not None and not task.done():
+        # Cancelling a task that has finished by then is a no-op
+        asyncio.get_running_loop().call_later(BOT_TASK_GRACE_SECONDS, task.cancel)
+    return connection
+
+
+def _on_bot_done(pc_id: str, task: asyncio.Task):
+    """Forget a finished bot task and surface a crash (BackgroundTask used to log it)."""
+    bot_tasks.pop(pc_id, None)
+    if not task.cancelled() and task.exception() is not None:
+        logger.opt(exception=task.exception()).error("Bot pipeline crashed for {}", pc_id)
 
-def get_ice_servers():
-    """Build ICE server list from env vars. Uses RTCIceServer objects throughout."""
-    from aiortc import RTCIceServer
 
+def _build_ice_servers():
+    """Build the ICE server config from env vars.
+
+    Returns (RTCIceServer list for aiortc, plain-dict list for the browser).
+    """
     servers = [RTCIceServer(urls="stun:stun.l.google.com:19302")]
+    payload = [{"urls": ["stun:stun.l.google.com:19302"]}]
 
     turn_url = os.getenv("TURN_URL")
     turn_username = os.getenv("TURN_USERNAME")
@@ -46,54 +91,134 @@ def get_ice_servers():
                 credential=turn_credential,
             )
         )
+        payload.append({
+            "urls": turn_urls,
+            "username": turn_username,
+            "credential": turn_credential,
+        })
         logger.info(f"TURN configured: {turn_urls}")
     else:
         logger.warning("TURN not configured - WebRTC may fail behind NAT/cloud")
 
-    return servers
+    return servers, payload
+
+
+# Env vars are fixed for the life of the process — build once, not per offer
+_ICE_SERVERS, _ICE_SERVERS_PAYLOAD = _build_ice_servers()
+_ICE_SERVERS_JSON = orjson.dumps(_ICE_SERVERS_PAYLOAD)
+
+
+class OfferBody(msgspec.Struct):
+    """POST /api/offer payload."""
+    sdp: str = ""
+    type: str = "offer"
+    pc_id: Optional[str] = None
+    tts_type: str = "deepgram"
+
+
+class DisconnectBody(msgspec.Struct):
+    """POST /api/disconnect payload."""
+    pc_id: Optional[str] = None
+
+
+async def _decode_body(request: Request, body_type):
+    """Decode and validate a JSON request body straight from bytes."""
+    try:
+        return msgspec.json.decode(await request.body(), type=body_type)
+    except msgspec.DecodeError as e:
+        # ValidationError is a DecodeError subclass
+        raise HTTPException(status_code=400, detail=f"Invalid request body: {e}")
+
+
+def get_ice_servers():
+    """ICE servers for new peer connections (RTCIceServer objects)."""
+    return _ICE_SERVERS
+
+
+async def _reaper():
+    """Periodically disconnect connections that have gone idle."""
+    while True:
+        await asyncio.sleep(REAPER_INTERVAL_SECONDS)
+        deadline = time.monotonic() - IDLE_TIMEOUT_SECONDS
+        idle = [cid for cid, seen in last_seen.items() if seen < deadline]
+        for cid in idle:
+            connection = _remove(cid)
+            if connection is None:
+                continue
+            logger.warning("Reaping idle connection: {}", cid)
+            try:
+                await connection.disconnect()
+            except Exception as e:
+                logger.error("Error disconnecting idle connection {}: {}", cid, e)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    # The frontend is a single static page — read it once, serve from memory
+    with open(_INDEX_PATH, "rb") as f:
+        app.state.index_html = f.read()
+    # Warm caches/workers in the background; the server accepts requests now
+    warmup_task = asyncio.create_task(warmup())
+    reaper_task = asyncio.create_task(_reaper())
     yield
-    # Cleanup all connections on shutdown
-    for pc_id, conn in pcs_map.items():
-        await conn.disconnect()
+    warmup_task.cancel()
+    reaper_task.cancel()
+    # Cleanup all connections on shutdown, concurrently (each may wait on DTLS/ICE teardown)
+    await asyncio.gather(
+        *(conn.disconnect() for conn in pcs_map.values()), return_exceptions=True
+    )
     pcs_map.clear()
+    pending = [t for t in bot_tasks.values() if not t.done()]
+    for t in pending:
+        t.cancel()
+    await asyncio.gather(*pending, return_exceptions=True)
+
+
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
 
 
-app = FastAPI(lifespan=lifespan)
+class CachedStaticFiles(StaticFiles):
+    """StaticFiles that makes browsers revalidate HTML on every load.
+
+    Starlette's ETag/Last-Modified make the revalidation a cheap 304.
+    """
+
+    async def get_response(self, path, scope):
+        response = await super().get_response(path, scope)
+        if response.status_code in (200, 304) and path.endswith(".html"):
+            response.headers["Cache-Control"] = "no-cache"
+        return response
+
 
 # Serve static files (frontend)
-app.mount("/static", StaticFiles(directory="static"), name="static")
+app.mount("/static", CachedStaticFiles(directory="static"), name="static")
 
 
 @app.get("/", response_class=HTMLResponse)
 async def index():
     """Serve the main frontend page."""
-    with open(os.path.join("static", "index.html"), "r", encoding="utf-8") as f:
-        return HTMLResponse(content=f.read())
+    return HTMLResponse(content=app.state.index_html)
 
 
 @app.post("/api/offer")
 async def webrtc_offer(request: Request):
     """Handle WebRTC SDP offer from the browser client."""
-    body = await request.json()
-    sdp = body.get("sdp")
-    sdp_type = body.get("type", "offer")
-    pc_id = body.get("pc_id")
-    tts_type = body.get("tts_type", "deepgram")
+    body = await _decode_body(request, OfferBody)
+    sdp = body.sdp
+    sdp_type = body.type
+    pc_id = body.pc_id
+    tts_type = body.tts_type
 
     if not sdp:
         raise HTTPException(status_code=400, detail="Missing SDP offer")
 
     # Reuse existing connection (renegotiation)
     if pc_id and pc_id in pcs_map:
-        logger.info(f"Renegotiating connection: {pc_id}")
+        logger.info("Renegotiating connection: {}", pc_id)
         connection = pcs_map[pc_id]
         await connection.renegotiate(sdp=sdp, type=sdp_type)
         answer = connection.get_answer()
-        return JSONResponse({"sdp": answer["sdp"], "pc_id": pc_id, "type": "answer"})
+        return ORJSONResponse({"sdp": answer["sdp"], "pc_id": pc_id, "type": "answer"})
 
     # New connection
     connection = SmallWebRTCConnection(
@@ -103,184 +228,75 @@ async def webrtc_offer(request: Request):
     @connection.event_handler("on_closed")
     async def on_closed(connection):
         cid = connection.pc_id
-        if cid in pcs_map:
-            del pcs_map[cid]
-            logger.info(f"Connection closed and removed: {cid}")
-        # Clean up session data
-        session_data.pop(cid, None)
+        if _remove(cid) is not None:
+            logger.info("Connection closed and removed: {}", cid)
 
     await connection.initialize(sdp=sdp, type=sdp_type)
     answer = connection.get_answer()
     pc_id = connection.pc_id
     pcs_map[pc_id] = connection
+    last_seen[pc_id] = time.monotonic()
 
-    logger.info(f"New connection: {pc_id}")
+    logger.info("New connection: {}", pc_id)
 
-    # Start the bot pipeline in the background
-    task = BackgroundTask(run_bot, connection, tts_type)
+    # Start the bot pipeline now so its setup overlaps sending the answer
+    task = asyncio.create_task(run_bot(connection, tts_type), name=f"bot-{pc_id}")
+    bot_tasks[pc_id] = task
+    task.add_done_callback(partial(_on_bot_done, pc_id))
 
-    return JSONResponse(
-        {"sdp": answer["sdp"], "pc_id": pc_id, "type": "answer"},
-        background=task,
-    )
+    return ORJSONResponse({"sdp": answer["sdp"], "pc_id": pc_id, "type": "answer"})
 
 
 @app.post("/api/disconnect")
 async def webrtc_disconnect(request: Request):
     """Handle client disconnect."""
-    body = await request.json()
-    pc_id = body.get("pc_id")
+    body = await _decode_body(request, DisconnectBody)
+    pc_id = body.pc_id
 
-    if pc_id and pc_id in pcs_map:
-        connection = pcs_map.pop(pc_id)
+    connection = _remove(pc_id) if pc_id else None
+    if connection is not None:
         await connection.disconnect()
-        session_data.pop(pc_id, None)
-        logger.info(f"Disconnected: {pc_id}")
-        return JSONResponse({"status": "disconnected"})
-
-    return JSONResponse({"status": "not_found"}, status_code=404)
-
-
-# @app.get("/api/session-data/{pc_id}")
-# async def get_session_data(pc_id: str):
-#     """Return live session data for the dashboard — flow state, transcript, metrics."""
-#     data = session_data.get(pc_id)
-#     if not data:
-#         return JSONResponse({"current_node": "", "nodes": FLOW_NODES, "transcript": [], "metrics": {}})
-
-#     # Transcript from frame processors (real-time capture)
-#     transcript = data.get("transcript", [])
-
-#     # Estimate token usage from context messages
-#     ctx = data.get("_context")
-#     all_msgs = []
-#     if ctx:
-#         try:
-#             all_msgs = ctx.messages if hasattr(ctx, "messages") else []
-#         except Exception:
-#             pass
-#     total_chars = 0
-#     for m in all_msgs:
-#         c = m.get("content", "") if isinstance(m, dict) else ""
-#         if isinstance(c, str):
-#             total_chars += len(c)
-#     user_msgs = sum(1 for m in all_msgs if m.get("role") == "user")
-#     assistant_msgs = sum(1 for m in all_msgs if m.get("role") == "assistant")
-#     system_msgs = sum(1 for m in all_msgs if m.get("role") == "system")
-
-#     return JSONResponse({
-#         "current_node": data.get("current_node", ""),
-#         "nodes": FLOW_NODES,
-#         "transcript": transcript,
-#         "tts_type": data.get("tts_type", "deepgram"),
-#         "metrics": {
-#             "est_tokens": total_chars // 3,
-#             "total_messages": len(all_msgs),
-#             "user_messages": user_msgs,
-#             "assistant_messages": assistant_msgs,
-#             "system_messages": system_msgs,
-#             "llm": "gemini-2.5-flash",
-#             "stt": "Deepgram Nova-2",
-#             "tts": "Edge TTS" if data.get("tts_type") == "edge" else "Deepgram Aura-2",
-#         },
-#     })
-
-# @app.get("/api/session-data/{pc_id}")
-# async def get_session_data(pc_id: str):
-#     """
-#     Return session data for the dashboard:
-#     - transcript
-#     - current flow node
-#     - flow pipeline structure
-#     - metrics
-#     """
-#     session = session_data.get(pc_id)
-#     if not session:
-#         return {"error": "Session not found"}
-
-#     transcript = session.get("transcript", [])
-#     current_node = session.get("current_node", "")
-    
-#     # ✅ FIX: Build the nodes array from your flow config
-#     nodes = [
-#         {"id": "greeting", "label": "Greeting", "type": "start"},
-#         {"id": "overdue_info", "label": "Overdue Info", "type": "process"},
-#         {"id": "payment_discussion", "label": "Payment Discussion", "type": "process"},
-#         {"id": "promise_to_pay", "label": "Promise to Pay", "type": "process"},
-#         {"id": "partial_payment", "label": "Partial Payment", "type": "process"},
-#         {"id": "cannot_pay", "label": "Cannot Pay", "type": "process"},
-#         {"id": "escalation", "label": "Escalation", "type": "process"},
-#         {"id": "closing", "label": "Closing", "type": "end"}
-#     ]
-
-#     # Metrics calculation
-#     metrics = {}
-#     try:
-#         agg = session.get("context_aggregator")
-#         if agg and hasattr(agg, "get_messages_for_persistent_storage"):
-#             all_msgs = agg.get_messages_for_persistent_storage()
-            
-#             # ⚠️ Handle both dict and Pydantic Content objects
-#             def get_role(msg):
-#                 if isinstance(msg, dict):
-#                     return msg.get("role")
-#                 else:
-#                     return getattr(msg, "role", None)
-            
-#             def get_parts(msg):
-#                 if isinstance(msg, dict):
-#                     return msg.get("parts", [])
-#                 else:
-#                     return getattr(msg, "parts", [])
-            
-#             user_msgs = sum(1 for m in all_msgs if get_role(m) == "user")
-#             assistant_msgs = sum(1 for m in all_msgs if get_role(m) == "model")
-#             system_msgs = sum(1 for m in all_msgs if get_role(m) == "system")
-            
-#             # Estimate tokens
-#             total_text = ""
-#             for m in all_msgs:
-#                 parts = get_parts(m)
-#                 for part in parts:
-#                     if isinstance(part, dict):
-#                         total_text += part.get("text", "")
-#                     else:
-#                         total_text += getattr(part, "text", "")
-            
-#             est_tokens = len(total_text.split())
-
-#             metrics = {
-#                 "llm": "Google Gemini",
-#                 "stt": "Deepgram",
-#                 "tts": "Edge TTS",
-#                 "total_messages": len(all_msgs),
-#                 "user_messages": user_msgs,
-#                 "assistant_messages": assistant_msgs,
-#                 "system_messages": system_msgs,
-#                 "est_tokens": est_tokens
-#             }
-#     except Exception as e:
-#         logger.error(f"Error calculating metrics: {e}")
-#         metrics = {
-#             "llm": "Google Gemini",
-#             "stt": "Deepgram",
-#             "tts": "Edge TTS",
-#             "total_messages": 0,
-#             "user_messages": 0,
-#             "assistant_messages": 0,
-#             "system_messages": 0,
-#             "est_tokens": 0
-#         }
-
-#     return {
-#         "transcript": transcript,
-#         "current_node": current_node,
-#         "nodes": nodes,
-#         "metrics": metrics
-#     }
+        logger.info("Disconnected: {}", pc_id)
+        return ORJSONResponse({"status": "disconnected"})
+
+    return ORJSONResponse({"status": "not_found"}, status_code=404)
+
+
+# Static dashboard payload pieces, shared by every poll (never mutated)
+_METRICS_BASE_DG = {
+    "llm": "Google Gemini 2.5 Flash",
+    "stt": "Deepgram Nova-2",
+    "tts": "Deepgram Aura-2",
+    "total_messages": 0,
+    "user_messages": 0,
+    "assistant_messages": 0,
+    "system_messages": 0,
+    "est_tokens": 0
+}
+_METRICS_BASE_EDGE = {**_METRICS_BASE_DG, "tts": f"Edge TTS ({EDGE_TTS_VOICE})"}
+
+
+def _metrics_base(session: dict) -> dict:
+    return _METRICS_BASE_EDGE if session.get("tts_type") == "edge" else _METRICS_BASE_DG
+
+
+def _stats_metrics(session: dict) -> Optional[dict]:
+    """Dashboard metrics from the bot's running counters (None if unavailable)."""
+    stats = session.get("_stats")
+    if stats is None:
+        return None
+    return {
+        **_metrics_base(session),
+        "total_messages": stats["total"],
+        "user_messages": stats["user"],
+        "assistant_messages": stats["assistant"],
+        "system_messages": stats["system"],
+        "est_tokens": int(stats["word_count"] * 1.3)
+    }
+
 
 @app.get("/api/session-data/{pc_id}")
-async def get_session_data(pc_id: str):
+async def get_session_data(pc_id: str, request: Request):
     """
     Return session data for the dashboard:
     - transcript
@@ -290,131 +306,111 @@ async def get_session_data(pc_id: str):
     """
     session = session_data.get(pc_id)
     if not session:
-        logger.warning(f"Session not found for pc_id: {pc_id}")
+        logger.warning("Session not found for pc_id: {}", pc_id)
         return {"error": "Session not found"}
 
     transcript = session.get("transcript", [])
     current_node = session.get("current_node", "")
-    
-    # Build the nodes array from your flow config
-    nodes = [
-        {"id": "greeting", "label": "Greeting", "type": "start"},
-        {"id": "overdue_info", "label": "Overdue Info", "type": "process"},
-        {"id": "understand_situation", "label": "Situation", "type": "process"},
-        {"id": "payment_options", "label": "Options", "type": "process"},
-        {"id": "commitment", "label": "Commitment", "type": "process"},
-        {"id": "promise_to_pay", "label": "PTP", "type": "process"},
-        {"id": "end", "label": "Complete", "type": "end"}
-    ]
-
-    # Metrics calculation with better error handling
-    metrics = {
-        "llm": "Google Gemini 2.5 Flash",
-        "stt": "Deepgram Nova-2",
-        "tts": "Edge TTS (hi-IN-SwaraNeural)" if session.get("tts_type") == "edge" else "Deepgram Aura-2",
-        "total_messages": 0,
-        "user_messages": 0,
-        "assistant_messages": 0,
-        "system_messages": 0,
-        "est_tokens": 0
-    }
-    
+
+    # Dashboards poll about once a second; let them revalidate for a bare 304
+    # while the transcript, flow node and message stats are unchanged
+    stats = session.get("_stats")
+    stats_key = f"{stats['total']}-{stats['word_count']}" if stats is not None else "0-0"
+    etag = f'W/"{len(transcript)}-{stats_key}-{current_node}"'
+    cache_headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=cache_headers)
+
+    # Metrics come from the bot context's running counters (zeroed base if missing)
+    metrics = _metrics_base(session)
     try:
-        agg = session.get("context_aggregator")
-        
-        if not agg:
-            logger.warning(f"No context_aggregator found for session {pc_id}")
-        elif not hasattr(agg, "get_messages_for_persistent_storage"):
-            logger.warning(f"context_aggregator doesn't have get_messages_for_persistent_storage method")
+        if stats is not None:
+            metrics = _stats_metrics(session)
         else:
-            all_msgs = agg.get_messages_for_persistent_storage()
-            logger.debug(f"Retrieved {len(all_msgs)} messages from context aggregator for {pc_id}")
-            
-            # Handle both dict and Pydantic Content objects
-            def get_role(msg):
-                if isinstance(msg, dict):
-                    return msg.get("role")
-                else:
-                    return getattr(msg, "role", None)
-            
-            def get_parts(msg):
-                if isinstance(msg, dict):
-                    return msg.get("parts", [])
-                else:
-                    return getattr(msg, "parts", [])
-            
-            def get_text_from_part(part):
-                """Extract text from various part formats."""
-                if isinstance(part, dict):
-                    return part.get("text", "")
-                elif isinstance(part, str):
-                    return part
-                else:
-                    # Pydantic object
-                    return getattr(part, "text", "")
-            
-            user_msgs = 0
-            assistant_msgs = 0
-            system_msgs = 0
-            total_text = ""
-            
-            for m in all_msgs:
-                role = get_role(m)
-                if role == "user":
-                    user_msgs += 1
-                elif role == "model":  # Google uses "model" instead of "assistant"
-                    assistant_msgs += 1
-                elif role == "system":
-                    system_msgs += 1
-                
-                # Extract text from parts
-                parts = get_parts(m)
-                for part in parts:
-                    text = get_text_from_part(part)
-                    total_text += text + " "
-            
-            # Token estimation: words * 1.3 (accounts for subword tokenization)
-            word_count = len(total_text.split())
-            est_tokens = int(word_count * 1.3)
-            
-            metrics = {
-                "llm": "Google Gemini 2.5 Flash",
-                "stt": "Deepgram Nova-2",
-                "tts": "Edge TTS (hi-IN-SwaraNeural)" if session.get("tts_type") == "edge" else "Deepgram Aura-2",
-                "total_messages": len(all_msgs),
-                "user_messages": user_msgs,
-                "assistant_messages": assistant_msgs,
-                "system_messages": system_msgs,
-                "est_tokens": est_tokens
-            }
-            
-            logger.debug(f"Metrics for {pc_id}: {metrics}")
-            
+            logger.warning("No message stats found for session {}", pc_id)
     except Exception as e:
-        logger.error(f"Error calculating metrics for {pc_id}: {e}", exc_info=True)
+        logger.opt(exception=True).error("Error calculating metrics for {}: {}", pc_id, e)
+
+    return ORJSONResponse(
+        {
+            "transcript": transcript,
+            "current_node": current_node,
+            "nodes": FLOW_NODES,
+            "metrics": metrics
+        },
+        headers=cache_headers,
+    )
+
+# How often an idle dashboard socket checks that its call is still alive
+DASHBOARD_IDLE_CHECK_SECONDS = 15
+# Deltas buffered per dashboard socket before the bot asks it to resync
+DASHBOARD_QUEUE_MAX = 64
 
+
+def _dashboard_snapshot(session: dict) -> dict:
     return {
-        "transcript": transcript,
-        "current_node": current_node,
-        "nodes": nodes,
-        "metrics": metrics
+        "transcript": session.get("transcript", []),
+        "current_node": session.get("current_node", ""),
+        "nodes": FLOW_NODES,
+        "metrics": _stats_metrics(session) or _metrics_base(session),
     }
 
+
+@app.websocket("/ws/session/{pc_id}")
+async def session_updates(websocket: WebSocket, pc_id: str):
+    """Push dashboard updates instead of having the browser poll session-data.
+
+    Sends one full snapshot, then the deltas the bot queues on flow
+    transitions, new transcript lines and context message changes, each
+    with refreshed metrics.
+    Every open socket (tabs, reconnects) gets its own bounded queue.
+    """
+    await websocket.accept()
+    session = session_data.get(pc_id)
+    if not session:
+        # The pipeline may not have registered the session yet; client retries
+        await websocket.close(code=4404)
+        return
+
+    queue: asyncio.Queue = asyncio.Queue(maxsize=DASHBOARD_QUEUE_MAX)
+    queues = session.setdefault("_dash_queues", set())
+    queues.add(queue)
+    try:
+        await websocket.send_text(orjson.dumps(_dashboard_snapshot(session)).decode())
+        while True:
+            try:
+                delta = await asyncio.wait_for(queue.get(), DASHBOARD_IDLE_CHECK_SECONDS)
+            except asyncio.TimeoutError:
+                if pc_id not in session_data:
+                    break
+                continue
+            if delta.get("resync"):
+                # This socket fell behind and its backlog was dropped
+                update = _dashboard_snapshot(session)
+            else:
+                # The delta is shared with other sockets — don't mutate it
+                update = {**delta, "metrics": _stats_metrics(session) or _metrics_base(session)}
+            await websocket.send_text(orjson.dumps(update).decode())
+        await websocket.close()
+    except (WebSocketDisconnect, RuntimeError):
+        # Browser went away (RuntimeError: send/close after the socket closed)
+        pass
+    finally:
+        queues.discard(queue)
+
+
 @app.get("/api/ice-servers")
 async def ice_servers():
     """Return ICE server config for the browser client."""
-    servers = [{"urls": ["stun:stun.l.google.com:19302"]}]
-    turn_url = os.getenv("TURN_URL")
-    turn_username = os.getenv("TURN_USERNAME")
-    turn_credential = os.getenv("TURN_CREDENTIAL")
-    if turn_url and turn_username and turn_credential:
-        turn_urls = [u.strip() for u in turn_url.split(",")]
-        servers.append({
-            "urls": turn_urls,
-            "username": turn_username,
-            "credential": turn_credential,
-        })
-    return servers
+    return Response(content=_ICE_SERVERS_JSON, media_type="application/json")
+
+
+# Key/TURN configuration can't change while the process runs
+_HEALTH_STATIC = {
+    "google_api": "configured" if os.getenv("GOOGLE_API_KEY") else "missing",
+    "deepgram_api": "configured" if os.getenv("DEEPGRAM_API_KEY") else "missing",
+    "turn": "configured" if os.getenv("TURN_URL") else "missing",
+}
 
 
 @app.get("/api/health")
@@ -423,9 +419,7 @@ async def health():
     return {
         "status": "healthy",
         "active_connections": len(pcs_map),
-        "google_api": "configured" if os.getenv("GOOGLE_API_KEY") else "missing",
-        "deepgram_api": "configured" if os.getenv("DEEPGRAM_API_KEY") else "missing",
-        "turn": "configured" if os.getenv("TURN_URL") else "missing",
+        **_HEALTH_STATIC,
     }
 
 
@@ -444,4 +438,18 @@ if __name__ == "__main__":
     print(f"  Server starting at http://localhost:{args.port}")
     print(f"{'='*60}\n")
 
-    uvicorn.run("server:app", host=args.host, port=args.port, reload=not is_production)
+    # Pin the libuv loop (uvloop has no Windows build); every bot pipeline runs on it
+    loop = "asyncio" if sys.platform == "win32" else "uvloop"
+
+    uvicorn.run(
+        "server:app",
+        host=args.host,
+        port=args.port,
+        reload=not is_production,
+        loop=loop,
+        # C HTTP parser (installed by uvicorn[standard]) for signaling and dashboard polls
+        http="httptools",
+        # Single worker on purpose: connections, bot tasks and session data
+        # live in this process's memory and can't be shared across workers
+        workers=1,
+    )
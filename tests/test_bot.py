@@ -0,0 +1,37 @@
+import asyncio
+from functools import partial
+
+import pytest
+
+pytest.importorskip("pipecat")
+pytest.importorskip("pipecat_flows")
+pytest.importorskip("deepgram")
+pytest.importorskip("google.genai")
+
+import bot
+
+
+@pytest.fixture
+def dashboard():
+    """A registered session with one dashboard socket's queue."""
+    queue = asyncio.Queue()
+    bot.session_data["test-pc"] = {"_dash_queues": {queue}}
+    yield queue
+    bot.session_data.pop("test-pc", None)
+
+
+def test_assistant_message_pushes_metrics(dashboard):
+    context = bot.StatsLLMContext(on_change=partial(bot._push_metrics, "test-pc"))
+    context.add_message({"role": "assistant", "content": "Namaste, main Priya bol rahi hoon."})
+    assert context.stats["assistant"] == 1
+    assert context.stats["word_count"] == 6
+    assert dashboard.get_nowait() == {"metrics": None}
+    assert dashboard.empty()
+
+
+def test_set_messages_recounts(dashboard):
+    context = bot.StatsLLMContext(on_change=partial(bot._push_metrics, "test-pc"))
+    context.add_messages([{"role": "user", "content": "haan"}, {"role": "assistant", "content": "ji"}])
+    context.set_messages([{"role": "system", "content": "Be polite."}])
+    assert context.stats == {"total": 1, "user": 0, "assistant": 0, "system": 1, "word_count": 2}
+    assert dashboard.qsize() == 2
@@ -0,0 +1,67 @@
+import io
+
+import pytest
+
+av = pytest.importorskip("av")
+np = pytest.importorskip("numpy")
+pytest.importorskip("edge_tts")
+pytest.importorskip("pipecat")
+
+from edge_tts_service import EDGE_TTS_SAMPLE_RATE, MP3StreamDecoder, decode_mp3_to_pcm
+
+if "libmp3lame" not in av.codecs_available:
+    pytest.skip("PyAV build has no MP3 encoder", allow_module_level=True)
+
+
+def encode_mp3(rate=EDGE_TTS_SAMPLE_RATE, gapless_tag=True):
+    """One second of tone as MP3, with or without the Xing/Info + LAME tag."""
+    buf = io.BytesIO()
+    container = av.open(buf, "w", format="mp3", options={} if gapless_tag else {"write_xing": "0"})
+    stream = container.add_stream("libmp3lame", rate=rate, layout="mono")
+    tone = (0.3 * np.sin(2 * np.pi * 440 * np.arange(rate) / rate)).astype(np.float32)
+    frame = av.AudioFrame.from_ndarray(tone.reshape(1, -1), format="flt", layout="mono")
+    frame.sample_rate = rate
+    for packet in [*stream.encode(frame), *stream.encode(None)]:
+        container.mux(packet)
+    container.close()
+    return buf.getvalue()
+
+
+def stream_decode(mp3, fragment_size):
+    decoder = MP3StreamDecoder()
+    pcm = b"".join(
+        decoder.feed(mp3[i : i + fragment_size]) for i in range(0, len(mp3), fragment_size)
+    )
+    return pcm + decoder.flush()
+
+
+def samples(pcm):
+    return np.frombuffer(pcm, dtype="<i2").astype(int)
+
+
+# Whole stream, byte by byte (tags split across fragments), and uneven fragments
+FRAGMENT_SIZES = [1 << 20, 1, 7, 500]
+
+
+@pytest.mark.parametrize("fragment_size", FRAGMENT_SIZES)
+def test_tagged_stream_trims_delay_and_padding(fragment_size):
+    mp3 = encode_mp3()
+    streamed = samples(stream_decode(mp3, fragment_size))
+    buffered = samples(decode_mp3_to_pcm(mp3))
+    assert len(streamed) == len(buffered) == EDGE_TTS_SAMPLE_RATE
+    assert np.abs(streamed - buffered).max() <= 1
+
+
+@pytest.mark.parametrize("fragment_size", FRAGMENT_SIZES)
+def test_untagged_stream_is_not_trimmed(fragment_size):
+    mp3 = encode_mp3(gapless_tag=False)
+    streamed = samples(stream_decode(mp3, fragment_size))
+    buffered = samples(decode_mp3_to_pcm(mp3))
+    # Encoder delay and padding stay in, exactly as in the container decode
+    assert len(streamed) == len(buffered) > EDGE_TTS_SAMPLE_RATE
+
+
+@pytest.mark.parametrize("rate", [16000, 22050])
+def test_trim_counts_source_samples(rate):
+    streamed = stream_decode(encode_mp3(rate=rate), 7)
+    assert len(samples(streamed)) == EDGE_TTS_SAMPLE_RATE
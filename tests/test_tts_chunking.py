@@ -0,0 +1,62 @@
+from tts_chunking import next_split, split_for_tts
+
+
+def stream(text, chunk_size):
+    """Feed text through next_split the way SentenceChunker does."""
+    parts, buffer = [], ""
+    for i in range(0, len(text), chunk_size):
+        buffer += text[i : i + chunk_size]
+        while (cut := next_split(buffer)) is not None:
+            parts.append(buffer[:cut])
+            buffer = buffer[cut:]
+    parts.append(buffer)
+    return [part.strip() for part in parts if part.strip()]
+
+
+def test_amount_is_not_split():
+    assert split_for_tts("Total Rs. 17,000 outstanding hai. Kab tak de payenge?") == [
+        "Total Rs. 17,000 outstanding hai.",
+        "Kab tak de payenge?",
+    ]
+
+
+def test_amount_split_across_chunks():
+    text = "Aapka EMI Rs. 8,500 hai aur total Rs. 17,000 outstanding hai. Aap kab pay karenge?"
+    expected = split_for_tts(text)
+    for chunk_size in range(1, len(text) + 1):
+        assert stream(text, chunk_size) == expected
+
+
+def test_waits_on_ambiguous_buffer_end():
+    # The chunk may end mid-amount or right after an abbreviation
+    assert next_split("Aapka total outstanding Rs.") is None
+    assert next_split("Aapka total outstanding Rs. 17,") is None
+    assert next_split("Aapka total outstanding Rs. 17,000.") is None
+
+
+def test_comma_needs_a_full_clause():
+    assert split_for_tts("Haan, main samajh rahi hoon, Rajesh ji.") == [
+        "Haan, main samajh rahi hoon,",
+        "Rajesh ji.",
+    ]
+
+
+def test_danda_ends_a_sentence():
+    assert split_for_tts("Dhanyavaad। Aapka din shubh ho!") == ["Dhanyavaad।", "Aapka din shubh ho!"]
+
+
+def test_long_run_cut_at_word_break():
+    text = "shabd " * 30
+    parts = split_for_tts(text)
+    assert " ".join(parts) == text.strip()
+    assert all(len(part) <= 80 for part in parts)
+
+
+def test_no_ends_a_sentence_unless_before_a_number():
+    assert split_for_tts("No. I will pay next week.") == ["No.", "I will pay next week."]
+    assert split_for_tts("Account No. 78543 is overdue.") == ["Account No. 78543 is overdue."]
+    # Which one it is depends on the next word, so wait for it
+    assert next_split("No. ") is None
+    for text in ("No. I will pay next week.", "Account No. 78543 is overdue."):
+        for chunk_size in range(1, len(text) + 1):
+            assert stream(text, chunk_size) == split_for_tts(text)
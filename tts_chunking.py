@@ -0,0 +1,76 @@
+"""
+TTS Text Chunking
+=================
+Decides where streamed LLM text is cut into utterances for TTS.
+
+A boundary only counts once the character after it has arrived, so the cuts
+depend on the text alone and never on where the LLM's stream chunks happen
+to end. "Rs. 17,000" is never split: "Rs." is a known abbreviation and the
+comma in "17,000" is not followed by whitespace.
+"""
+
+import re
+from typing import List, Optional
+
+# Cut long clause-less runs at a word break past this many characters
+MAX_CHARS = 80
+# Only break at a comma once the clause has this many words
+MIN_CLAUSE_WORDS = 4
+
+# Sentence enders (including the Devanagari danda) or a comma, confirmed by
+# the whitespace that follows
+_BOUNDARY = re.compile(r"[.?!,\u0964](?=\s)")
+
+# Abbreviations whose trailing period doesn't end a sentence
+_ABBREVIATION = re.compile(r"(?:^|[\s(])(?:Rs|Dr|Mr|Mrs|Ms|St)\.$", re.IGNORECASE)
+# "No." only abbreviates before a number ("No. 5"); otherwise it's the answer
+_NUMBER_ABBREVIATION = re.compile(r"(?:^|[\s(])No\.$", re.IGNORECASE)
+
+
+def _is_abbreviation(text: str, end: int) -> Optional[bool]:
+    """Whether the period before ``end`` is an abbreviation's; None if unknown yet."""
+    before = text[:end]
+    if _ABBREVIATION.search(before):
+        return True
+    if _NUMBER_ABBREVIATION.search(before):
+        after = text[end:].lstrip()
+        # Decided by the next word, which may not have streamed in yet
+        return after[0].isdigit() if after else None
+    return False
+
+
+def next_split(text: str) -> Optional[int]:
+    """Index at which to cut the first utterance off ``text``, or None to wait.
+
+    Only looks at the first MAX_CHARS + 1 characters, so the answer for a
+    prefix never changes as more text streams in.
+    """
+    window = text[: MAX_CHARS + 1]
+    for match in _BOUNDARY.finditer(window):
+        end = match.end()
+        if match.group() == ",":
+            if len(text[:end].split()) >= MIN_CLAUSE_WORDS:
+                return end
+        elif match.group() != ".":
+            return end
+        else:
+            abbreviation = _is_abbreviation(text, end)
+            if abbreviation is None:
+                return None
+            if not abbreviation:
+                return end
+    if len(text) > MAX_CHARS:
+        cut = window.rfind(" ")
+        if cut > 0:
+            return cut
+    return None
+
+
+def split_for_tts(text: str) -> List[str]:
+    """Cut complete text exactly as SentenceChunker cuts it while streaming."""
+    parts = []
+    while (cut := next_split(text)) is not None:
+        parts.append(text[:cut])
+        text = text[cut:]
+    parts.append(text)
+    return [part.strip() for part in parts if part.strip()]